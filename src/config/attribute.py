@@ -4,6 +4,9 @@ from viam.proto.app.robot import ServiceConfig
 
 
 class Attribute:
+    # Attributes are shared module-level schema objects, validate() must not store state
+    __slots__ = ("field_name", "required", "default_value")
+
     def __init__(
         self,
         field_name: str,
@@ -30,6 +33,8 @@ class Attribute:
 
 
 class IntAttribute(Attribute):
+    __slots__ = ("min_value", "max_value")
+
     def __init__(
         self,
         field_name: str,
@@ -66,6 +71,8 @@ class IntAttribute(Attribute):
 
 
 class FloatAttribute(Attribute):
+    __slots__ = ("min_value", "max_value")
+
     def __init__(
         self,
         field_name: str,
@@ -99,6 +106,8 @@ class FloatAttribute(Attribute):
 
 
 class StringAttribute(Attribute):
+    __slots__ = ("allowlist",)
+
     def __init__(
         self,
         field_name: str,
@@ -134,6 +143,8 @@ class StringAttribute(Attribute):
 
 
 class BoolAttribute(Attribute):
+    __slots__ = ()
+
     def __init__(
         self,
         field_name: str,
@@ -159,6 +170,8 @@ class BoolAttribute(Attribute):
 
 
 class DictAttribute(Attribute):
+    __slots__ = ("fields",)
+
     def __init__(
         self,
         field_name: str,
@@ -173,20 +186,22 @@ class DictAttribute(Attribute):
         value = super().validate(config)
         if value is None:
             return value
+        # The nested fields are validated against the nested struct
+        nested_config = ServiceConfig(attributes=value.struct_value)
         value = dict(value.struct_value.fields)
         for attribute in self.fields:
             if not isinstance(attribute, Attribute):
                 raise ValueError(
                     f"Expected Attribute objects for '{self.field_name}', got {type(attribute).__name__}"
                 )
-            value[attribute.field_name] = attribute.validate(
-                config, value[attribute.field_name]
-            )
+            value[attribute.field_name] = attribute.validate(nested_config)
 
         return value
 
 
 class ChosenLabelsAttribute(Attribute):
+    __slots__ = ()
+
     def __init__(
         self,
         field_name: str = "chosen_labels",
@@ -9,122 +9,196 @@ from src.config.attribute import (
     StringAttribute,
 )
 
+_LAMBDA_VALUE = FloatAttribute(
+    field_name="lambda_value",
+    min_value=0,
+    max_value=1,
+    default_value=0.0005,  # TODO: change that when we choose our embedder
+)
+_MAX_AGE_TRACK = IntAttribute(
+    field_name="max_age_track",
+    min_value=0,
+    max_value=100000,
+    default_value=1000,
+)
+_EMBEDDER_THRESHOLD = FloatAttribute(
+    field_name="embedder_threshold",
+    min_value=0,
+    max_value=1,
+    default_value=0.3,
+)
+_MAX_FREQUENCY = FloatAttribute(
+    field_name="max_frequency_hz",
+    default_value=10,
+    min_value=0.1,
+    max_value=100,
+)
+_START_BACKGROUND_LOOP = BoolAttribute(
+    field_name="_start_background_loop", default_value=True
+)
+_CROP_REGION = DictAttribute(
+    field_name="crop_region",
+    default_value=None,
+    fields=[
+        FloatAttribute(
+            field_name="x1_rel", min_value=0, max_value=1, default_value=0.0
+        ),
+        FloatAttribute(
+            field_name="y1_rel", min_value=0, max_value=1, default_value=0.0
+        ),
+        FloatAttribute(
+            field_name="x2_rel", min_value=0, max_value=1, default_value=1.0
+        ),
+        FloatAttribute(
+            field_name="y2_rel", min_value=0, max_value=1, default_value=1.0
+        ),
+    ],
+)
+
 
 class TrackingConfig:
+    __slots__ = (
+        "lambda_value",
+        "max_age_track",
+        "embedder_threshold",
+        "max_frequency",
+        "_start_background_loop",
+        "crop_region",
+    )
+
     def __init__(self, config: "ServiceConfig"):
-        self.lambda_value = FloatAttribute(
-            field_name="lambda_value",
-            min_value=0,
-            max_value=1,
-            default_value=0.0005,  # TODO: change that when we choose our embedder
-        ).validate(config)
-        self.max_age_track = IntAttribute(
-            field_name="max_age_track",
-            min_value=0,
-            max_value=100000,
-            default_value=1000,
-        ).validate(config)
-        self.embedder_threshold = FloatAttribute(
-            field_name="embedder_threshold",
-            min_value=0,
-            max_value=1,
-            default_value=0.3,
-        ).validate(config)
-
-        self.max_frequency = FloatAttribute(
-            field_name="max_frequency_hz",
-            default_value=10,
-            min_value=0.1,
-            max_value=100,
-        ).validate(config)
-
-        self._start_background_loop = BoolAttribute(
-            field_name="_start_background_loop", default_value=True
-        ).validate(config)
-
-        self.crop_region = DictAttribute(
-            field_name="crop_region",
-            default_value=None,
-            fields=[
-                FloatAttribute(field_name="x1_rel", min_value=0, max_value=1),
-                FloatAttribute(field_name="y1_rel", min_value=0, max_value=1),
-                FloatAttribute(field_name="x2_rel", min_value=0, max_value=1),
-                FloatAttribute(field_name="y2_rel", min_value=0, max_value=1),
-            ],
-        ).validate(config)
+        self.lambda_value = _LAMBDA_VALUE.validate(config)
+        self.max_age_track = _MAX_AGE_TRACK.validate(config)
+        self.embedder_threshold = _EMBEDDER_THRESHOLD.validate(config)
+
+        self.max_frequency = _MAX_FREQUENCY.validate(config)
+
+        self._start_background_loop = _START_BACKGROUND_LOOP.validate(config)
+
+        self.crop_region = _CROP_REGION.validate(config)
+
+
+_DETECTOR_NAME = StringAttribute(
+    field_name="detector_name",
+    default_value=None,
+)
+_CHOSEN_LABELS = ChosenLabelsAttribute(
+    field_name="chosen_labels",
+    default_value=None,
+)
+_DETECTOR_DEVICE = StringAttribute(
+    field_name="detector_device",
+    default_value="cpu",
+    allowlist=["cpu", "cuda"],  # TODO: can add MPS backend here if we want
+)
+_ENABLE_DEBUG_TOOLS = BoolAttribute(
+    field_name="_enable_debug_tools", default_value=False
+)
+_PATH_TO_DEBUG_DIRECTORY = StringAttribute(
+    field_name="_path_to_debug_directory",
+    default_value=None,
+)
+_MAX_SIZE_DEBUG_DIRECTORY = IntAttribute(
+    field_name="_max_size_debug_directory", default_value=200
+)
 
 
 class DetectorConfig:
+    __slots__ = (
+        "detector_name",
+        "chosen_labels",
+        "device",
+        "_enable_debug_tools",
+        "_path_to_debug_directory",
+        "_max_size_debug_directory",
+    )
+
     def __init__(self, config: "ServiceConfig"):
-        self.detector_name = StringAttribute(
-            field_name="detector_name",
-            default_value=None,
-        ).validate(config)
-        self.chosen_labels = ChosenLabelsAttribute(
-            field_name="chosen_labels",
-            default_value=None,
-        ).validate(config)
-        self.device = StringAttribute(
-            field_name="detector_device",
-            default_value="cpu",
-            allowlist=["cpu", "cuda"],  # TODO: can add MPS backend here if we want
-        ).validate(config)
-        self._enable_debug_tools = BoolAttribute(
-            field_name="_enable_debug_tools", default_value=False
-        ).validate(config)
-
-        self._path_to_debug_directory = StringAttribute(
-            field_name="_path_to_debug_directory",
-            default_value=None,
-        ).validate(config)
-
-        self._max_size_debug_directory = IntAttribute(
-            field_name="_max_size_debug_directory", default_value=200
-        ).validate(config)
+        self.detector_name = _DETECTOR_NAME.validate(config)
+        self.chosen_labels = _CHOSEN_LABELS.validate(config)
+        self.device = _DETECTOR_DEVICE.validate(config)
+        self._enable_debug_tools = _ENABLE_DEBUG_TOOLS.validate(config)
+
+        self._path_to_debug_directory = _PATH_TO_DEBUG_DIRECTORY.validate(config)
+
+        self._max_size_debug_directory = _MAX_SIZE_DEBUG_DIRECTORY.validate(config)
+
+
+_EMBEDDER_NAME = StringAttribute(
+    field_name="embedder_model",
+    default_value=None,
+)
+_EMBEDDER_DISTANCE = StringAttribute(
+    field_name="embedder_distance",
+    default_value="cosine",
+    allowlist=["cosine", "euclidean", "manhattan"],
+)
+# NOT DEFINITIVE ARGUMENTS
+_INPUT_HEIGHT = IntAttribute(
+    field_name="embedder_input_height",
+    default_value=112,
+)
+_INPUT_WIDTH = IntAttribute(
+    field_name="embedder_input_width",
+    default_value=112,
+)
+_INPUT_NAME = StringAttribute(
+    field_name="embedder_input_name",
+    default_value="input",
+)
+_OUTPUT_NAME = StringAttribute(
+    field_name="embedder_output_name",
+    default_value="output",
+)
+_EMBEDDER_DEVICE = StringAttribute(
+    field_name="embedder_device",
+    default_value="cuda",
+    allowlist=["cpu", "cuda"],
+)
+# Store the track feature vectors as int8, only with the cosine distance
+_QUANTIZE_FEATURES = BoolAttribute(
+    field_name="embedder_quantize_features", default_value=False
+)
 
 
 class EmbedderConfig:
+    __slots__ = (
+        "embedder_name",
+        "embedder_distance",
+        "input_height",
+        "input_width",
+        "input_name",
+        "output_name",
+        "device",
+        "quantize_features",
+    )
+
     def __init__(self, config: ServiceConfig):
-        self.embedder_name = StringAttribute(
-            field_name="embedder_model",
-            default_value=None,
-        ).validate(config)
+        self.embedder_name = _EMBEDDER_NAME.validate(config)
 
-        self.embedder_distance = StringAttribute(
-            field_name="embedder_distance",
-            default_value="cosine",
-            allowlist=["cosine", "euclidean", "manhattan"],
-        ).validate(config)
+        self.embedder_distance = _EMBEDDER_DISTANCE.validate(config)
 
         # NOT DEFINITIVE ARGUMENTS
-        self.input_height = IntAttribute(
-            field_name="embedder_input_height",
-            default_value=112,
-        ).validate(config)
+        self.input_height = _INPUT_HEIGHT.validate(config)
 
-        self.input_width = IntAttribute(
-            field_name="embedder_input_width",
-            default_value=112,
-        ).validate(config)
+        self.input_width = _INPUT_WIDTH.validate(config)
 
-        self.input_name = StringAttribute(
-            field_name="embedder_input_name",
-            default_value="input",
-        ).validate(config)
+        self.input_name = _INPUT_NAME.validate(config)
 
-        self.output_name = StringAttribute(
-            field_name="embedder_output_name",
-            default_value="output",
-        ).validate(config)
+        self.output_name = _OUTPUT_NAME.validate(config)
 
-        self.device = StringAttribute(
-            field_name="embedder_device",
-            default_value="cuda",
-            allowlist=["cpu", "cuda"],
-        ).validate(config)
+        self.device = _EMBEDDER_DEVICE.validate(config)
+
+        self.quantize_features = _QUANTIZE_FEATURES.validate(config)
+        if self.quantize_features and self.embedder_distance != "cosine":
+            raise ValueError(
+                f"'embedder_quantize_features' requires the cosine 'embedder_distance', got '{self.embedder_distance}'."
+            )
 
 
 class TrackerConfig:
+    __slots__ = ("config", "tracker_config", "detector_config", "embedder_config")
+
     def __init__(self, config: ServiceConfig):
         self.config = config
 
@@ -3,16 +3,23 @@ import logging
 import os
 from typing import Dict
 
+import numpy as np
 import pytest
 import pytest_asyncio
+import torch
 from google.protobuf.struct_pb2 import Struct
 from viam.proto.app.robot import ServiceConfig
 from viam.services.vision import Vision
 
+from src.config.config import EmbedderConfig
 from src.image.image import ImageObject
 from src.test.fake_camera import FakeCamera
 from src.test.fake_detector_vision_service import FakeDetectorVisionService
 from src.test.fake_embedder_ml_model_service import FakeEmbedderMLModel
+from src.tracker.embedder.custom_mlmodel_service_embedder import (
+    CustomMLModelServiceEmbedder,
+)
+from src.tracker.track import Track, TrackBuffer, pairwise_iou
 from src.tracker_service import TrackerService
 
 CAMERA_NAME = "fake-camera"
@@ -52,9 +59,7 @@ def get_config(config_dict: Dict) -> ServiceConfig:
     return config
 
 
-def get_vision_service(config_dict: Dict, reconfigure=True):
-    service = TrackerService("test")
-
+def get_dependencies() -> Dict:
     cam = FakeCamera(CAMERA_NAME, img_path=IMG_PATH, use_ring_buffer=True)
     camera_name = cam.get_resource_name(CAMERA_NAME)
 
@@ -64,20 +69,106 @@ def get_vision_service(config_dict: Dict, reconfigure=True):
     embedder = FakeEmbedderMLModel(EMBEDDER_NAME)
     embedder_name = embedder.get_resource_name(EMBEDDER_NAME)
 
+    return {
+        camera_name: cam,
+        detector_name: detector,
+        embedder_name: embedder,
+    }
+
+
+def get_vision_service(config_dict: Dict, reconfigure=True):
+    service = TrackerService("test")
+
     cfg = get_config(config_dict)
     service.validate_config(cfg)
     if reconfigure:
-        service.reconfigure(
-            cfg,
-            dependencies={
-                camera_name: cam,
-                detector_name: detector,
-                embedder_name: embedder,
-            },
-        )
+        service.reconfigure(cfg, dependencies=get_dependencies())
     return service
 
 
+@pytest.mark.asyncio
+async def test_unchanged_reconfigure_keeps_components():
+    dependencies = get_dependencies()
+    service = TrackerService("test")
+    service.reconfigure(get_config(WORKING_CONFIG_DICT), dependencies)
+    tracker, detector, embedder = service.tracker, service.detector, service.embedder
+
+    service.reconfigure(get_config(WORKING_CONFIG_DICT), dependencies)
+    assert service.tracker is tracker
+    assert service.detector is detector
+    assert service.embedder is embedder
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_changed_lambda_value_replaces_tracker():
+    dependencies = get_dependencies()
+    service = TrackerService("test")
+    service.reconfigure(get_config(WORKING_CONFIG_DICT), dependencies)
+    tracker, detector, embedder = service.tracker, service.detector, service.embedder
+
+    service.reconfigure(
+        get_config({**WORKING_CONFIG_DICT, "lambda_value": 0.5}), dependencies
+    )
+    await service._reconfig_task
+    assert service.tracker is not tracker
+    assert service.tracker.lambda_value == 0.5
+    assert service.detector is detector
+    assert service.embedder is embedder
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_close_after_consecutive_reconfigures():
+    running_config_dict = {**WORKING_CONFIG_DICT, "_start_background_loop": True}
+    dependencies = get_dependencies()
+    service = TrackerService("test")
+    service.reconfigure(get_config(running_config_dict), dependencies)
+    tracker = service.tracker
+    await asyncio.sleep(2 * tracker.sleep_period)
+    assert tracker.last_image is not None
+    assert not tracker.background_task.done()
+
+    service.reconfigure(
+        get_config({**running_config_dict, "lambda_value": 0.5}), dependencies
+    )
+    first_swap = service._reconfig_task
+    # let the first swap start waiting for the background loop to stop
+    await asyncio.sleep(0)
+    service.reconfigure(
+        get_config({**running_config_dict, "lambda_value": 0.6}), dependencies
+    )
+    await service.close()
+    assert first_swap.cancelled()
+    # the background loop is shielded from the cancelled swap and stopped cleanly
+    assert tracker.background_task.done()
+    assert not tracker.background_task.cancelled()
+    assert service.tracker is not tracker
+    assert service.tracker.lambda_value == 0.6
+    assert service.tracker.stop_event.is_set()
+    assert service.tracker.background_task.done()
+
+
+@pytest.mark.asyncio
+async def test_crop_region():
+    full_crop_region = {"x1_rel": 0.1, "y1_rel": 0.2, "x2_rel": 0.8, "y2_rel": 0.9}
+    service = get_vision_service(
+        {**WORKING_CONFIG_DICT, "crop_region": full_crop_region}
+    )
+    assert service.tracker.crop_region == pytest.approx(full_crop_region)
+    await service.close()
+
+    # The attribute schema is shared, so the missing coordinates must fall back
+    # to the defaults rather than to the values of the previous service.
+    service = get_vision_service(
+        {**WORKING_CONFIG_DICT, "crop_region": {"x1_rel": 0.2}}
+    )
+    assert service.tracker.crop_region == pytest.approx(
+        {"x1_rel": 0.2, "y1_rel": 0.0, "x2_rel": 1.0, "y2_rel": 1.0}
+    )
+    await service.close()
+
+
 class TestTracker:
     @pytest_asyncio.fixture(autouse=True)
     async def setup_service(self):
@@ -138,6 +229,123 @@ class TestTracker:
         assert dets[1].class_name.startswith("car")
 
 
+def test_aged_track_keeps_prediction_from_last_update():
+    track = Track(
+        track_id="person",
+        bbox=[0, 0, 10, 10],
+        feature_vector=torch.rand(512),
+        distance=0,
+    )
+    track.update(bbox=[2, 0, 12, 10], feature_vector=torch.rand(512), distance=0)
+    np.testing.assert_array_equal(track.predicted_bbox, [4, 0, 14, 10])
+
+    track.increment_age()
+    track.increment_age()
+    np.testing.assert_array_equal(track.bbox, [6, 0, 16, 10])
+    # the prediction is only refreshed by update()
+    np.testing.assert_array_equal(track.predicted_bbox, [4, 0, 14, 10])
+
+
+def test_pairwise_iou_matches_track_iou():
+    track_bboxes = [[0, 0, 10, 10], [5, 5, 20, 15], [100, 100, 110, 120]]
+    det_bboxes = [[0, 0, 10, 10], [8, 2, 18, 12], [50, 50, 60, 60], [0, 0, 0, 0]]
+    tracks = [
+        Track(track_id="person", bbox=bbox, feature_vector=torch.rand(512), distance=0)
+        for bbox in track_bboxes
+    ]
+    ious = pairwise_iou(
+        np.array([track.predicted_bbox for track in tracks]),
+        np.array(det_bboxes, dtype=np.float32),
+    )
+    assert ious.shape == (len(track_bboxes), len(det_bboxes))
+    for i, track in enumerate(tracks):
+        for j, bbox in enumerate(det_bboxes):
+            assert ious[i, j] == pytest.approx(track.iou(bbox), abs=1e-6)
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean", "manhattan"])
+@pytest.mark.parametrize(
+    "n_tracks, n_detections, dtype",
+    # cdist uses a different euclidean algorithm above 25 rows
+    [(3, 4, torch.float64), (30, 30, torch.float32)],
+)
+def test_compute_distance_matrix_matches_compute_distance(
+    metric, n_tracks, n_detections, dtype
+):
+    cfg = EmbedderConfig(get_config({"embedder_distance": metric}))
+    embedder = CustomMLModelServiceEmbedder(cfg, FakeEmbedderMLModel(EMBEDDER_NAME))
+    track_features = 4 * torch.rand(n_tracks, 512, dtype=dtype)
+    detection_features = 4 * torch.rand(n_detections, 512, dtype=dtype)
+    # identical vectors must be at distance 0
+    detection_features[0] = track_features[0]
+
+    distances = embedder.compute_distance_matrix(track_features, detection_features)
+    assert distances.shape == (n_tracks, n_detections)
+    rel, abs_ = (1e-6, 1e-9) if dtype == torch.float64 else (1e-5, 1e-4)
+    for i in range(n_tracks):
+        for j in range(n_detections):
+            expected = embedder.compute_distance(
+                track_features[i], detection_features[j]
+            )
+            assert distances[i, j] == pytest.approx(expected, rel=rel, abs=abs_)
+
+
+def test_quantized_features_round_trip():
+    buffer = TrackBuffer(quantize_features=True)
+    feature_vectors = torch.rand(3, 512, dtype=torch.float64)
+    slots = [buffer.allocate([0, 0, 10, 10]) for _ in feature_vectors]
+    for slot, feature_vector in zip(slots, feature_vectors):
+        buffer.set_feature(slot, feature_vector)
+    assert buffer.features.dtype == torch.int8
+
+    normalized = torch.nn.functional.normalize(feature_vectors, dim=1)
+    for slot, expected in zip(slots, normalized):
+        restored = buffer.get_features(slot)
+        assert restored.dtype == torch.float64
+        # rounding to the nearest step of 1 / 127
+        assert torch.max(torch.abs(restored - expected)) <= 0.5 / 127 + 1e-12
+    gathered = buffer.gather_features(slots)
+    assert torch.equal(gathered, torch.stack([buffer.get_features(s) for s in slots]))
+
+
+def test_quantized_features_preserve_cosine_ranking():
+    torch.manual_seed(0)
+    cfg = EmbedderConfig(
+        get_config({"embedder_distance": "cosine", "embedder_quantize_features": True})
+    )
+    embedder = CustomMLModelServiceEmbedder(cfg, FakeEmbedderMLModel(EMBEDDER_NAME))
+    track_feature = torch.rand(512, dtype=torch.float64)
+    # detections further and further away from the track
+    detection_features = torch.stack(
+        [
+            track_feature + noise_level * torch.randn(512, dtype=torch.float64)
+            for noise_level in (0.1, 0.5, 1.0, 2.0)
+        ]
+    )
+    buffer = TrackBuffer(quantize_features=True)
+    slot = buffer.allocate([0, 0, 10, 10])
+    buffer.set_feature(slot, track_feature)
+
+    distances = embedder.compute_distance_matrix(
+        track_feature.unsqueeze(0), detection_features
+    )[0]
+    quantized_distances = embedder.compute_distance_matrix(
+        buffer.gather_features([slot]), detection_features
+    )[0]
+    assert list(np.argsort(quantized_distances)) == list(np.argsort(distances))
+    assert np.max(np.abs(quantized_distances - distances)) < 1 / 127
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "manhattan"])
+def test_quantized_features_require_cosine_distance(metric):
+    with pytest.raises(ValueError):
+        EmbedderConfig(
+            get_config(
+                {"embedder_distance": metric, "embedder_quantize_features": True}
+            )
+        )
+
+
 if __name__ == "__main__":
     # Run all tests with pytest
     pytest.main(
@@ -56,6 +56,36 @@ class Embedder(ABC):
             raise ValueError(f"Unsupported metric '{self.distance}'")
         return distance.cpu().item()
 
+    def compute_distance_matrix(
+        self, track_features: torch.Tensor, detection_features: torch.Tensor
+    ) -> np.ndarray:
+        """
+        Compute the distances between every pair of feature vectors in one batched operation.
+
+        :param track_features: (T, dim) tensor of track feature vectors.
+        :param detection_features: (D, dim) tensor of detection feature vectors.
+        :return: (T, D) numpy array of distances.
+        """
+        if self.distance == "euclidean":
+            # cdist switches to a less precise matmul-based algorithm above 25 rows
+            distances = torch.cdist(
+                track_features,
+                detection_features,
+                p=2,
+                compute_mode="donot_use_mm_for_euclid_dist",
+            )
+        elif self.distance == "cosine":
+            distances = (
+                1
+                - torch.nn.functional.normalize(track_features, dim=1)
+                @ torch.nn.functional.normalize(detection_features, dim=1).T
+            )
+        elif self.distance == "manhattan":
+            distances = torch.cdist(track_features, detection_features, p=1)
+        else:
+            raise ValueError(f"Unsupported metric '{self.distance}'")
+        return distances.cpu().numpy()
+
     def crop_detections(
         self, image: ImageObject, detections: List[Detection]
     ) -> np.ndarray:
@@ -1,10 +1,203 @@
-from typing import Optional
+from typing import List, Optional
 
 import numpy as np
 import torch
 from viam.services.vision import Detection
 
 
+class TrackBuffer:
+    """
+    Structure-of-arrays storage for the motion state and features of a set of tracks.
+
+    Each track owns one row (slot) of the buffers, so its bbox, velocity and
+    prediction are written in place instead of allocating small ndarrays on
+    every update, and the batched IoU reads the predictions of all tracks
+    directly. Feature vectors are copied in place instead of allocating a new
+    tensor per update.
+
+    Attributes:
+        bboxes: (capacity, 4) array of the current bounding boxes [x1, y1, x2, y2]
+        velocities: (capacity, 4) array of the velocities [dx1, dy1, dx2, dy2]
+        predicted_bboxes: (capacity, 4) array of the predicted bounding boxes
+        features: (capacity, dim) tensor of the feature vectors, allocated on the
+            device and with the dtype of the first feature vector written. If
+            quantize_features is set, the L2-normalized feature vectors are stored
+            as int8 scaled by QUANTIZATION_SCALE instead.
+    """
+
+    QUANTIZATION_SCALE = 127
+
+    def __init__(self, capacity: int = 64, quantize_features: bool = False):
+        """
+        :param capacity: Initial number of slots. The buffers grow when full.
+        :param quantize_features: Store feature vectors as int8. Only suited to the
+            cosine distance, which does not depend on the norm of the vectors.
+        """
+        self.bboxes = np.zeros((capacity, 4), dtype=np.float32)
+        self.velocities = np.zeros((capacity, 4), dtype=np.float32)
+        self.predicted_bboxes = np.zeros((capacity, 4), dtype=np.float32)
+        self.features: Optional[torch.Tensor] = None
+        self.quantize_features = quantize_features
+        self._feature_dtype: Optional[torch.dtype] = None
+        # Reused buffer the quantized feature vectors are gathered into
+        self._dequantized_features: Optional[torch.Tensor] = None
+        self._free_slots: List[int] = list(range(capacity - 1, -1, -1))
+
+    def allocate(self, bbox) -> int:
+        """
+        Reserve a slot for a new track, initialized with no motion.
+
+        :param bbox: Bounding box coordinates [x1, y1, x2, y2].
+        :return: Index of the slot.
+        """
+        if not self._free_slots:
+            self._grow()
+        idx = self._free_slots.pop()
+        self.bboxes[idx] = bbox
+        self.velocities[idx] = 0
+        self.predicted_bboxes[idx] = bbox
+        return idx
+
+    def release(self, idx: int):
+        """
+        Give the slot of a deleted track back to the buffer.
+        """
+        self._free_slots.append(idx)
+
+    def set_feature(self, idx: int, feature_vector: torch.Tensor):
+        """
+        Copy a feature vector into the row of a slot.
+        """
+        if self.features is None:
+            self._feature_dtype = feature_vector.dtype
+            self.features = torch.empty(
+                (len(self.bboxes), feature_vector.shape[-1]),
+                dtype=torch.int8 if self.quantize_features else feature_vector.dtype,
+                device=feature_vector.device,
+            )
+        elif feature_vector.shape[-1] != self.features.shape[1]:
+            raise ValueError(
+                f"Expected feature vector of size {self.features.shape[1]}, got {feature_vector.shape[-1]}"
+            )
+        if self.quantize_features:
+            feature_vector = torch.clamp(
+                (
+                    torch.nn.functional.normalize(feature_vector, dim=-1)
+                    * self.QUANTIZATION_SCALE
+                ).round(),
+                -128,
+                127,
+            ).to(torch.int8)
+        self.features[idx].copy_(feature_vector, non_blocking=True)
+
+    def get_features(self, idx: int) -> torch.Tensor:
+        """
+        Return the feature vector of a slot.
+        A quantized feature vector is scaled back to unit norm, in the dtype of
+        the feature vectors that were written.
+        """
+        features = self.features[idx]
+        if self.quantize_features:
+            features = features.to(self._feature_dtype) / self.QUANTIZATION_SCALE
+        return features
+
+    def gather_features(self, slots: List[int]) -> torch.Tensor:
+        """
+        Return the (len(slots), dim) feature vectors of a list of slots.
+        Quantized feature vectors are gathered as int8 and then scaled back into a
+        reused buffer instead of a new float tensor, so the result is only valid
+        until the next call.
+        """
+        if not self.quantize_features:
+            return self.features[slots]
+        n_slots = len(slots)
+        if (
+            self._dequantized_features is None
+            or len(self._dequantized_features) < n_slots
+        ):
+            self._dequantized_features = torch.empty(
+                (len(self.bboxes), self.features.shape[1]),
+                dtype=self._feature_dtype,
+                device=self.features.device,
+            )
+        features = self._dequantized_features[:n_slots]
+        features.copy_(self.features[slots])
+        return features.div_(self.QUANTIZATION_SCALE)
+
+    def _grow(self):
+        capacity = len(self.bboxes)
+        new_capacity = max(1, 2 * capacity)
+        for name in ("bboxes", "velocities", "predicted_bboxes"):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity, 4), dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+        if self.features is not None:
+            features = self.features.new_empty((new_capacity, self.features.shape[1]))
+            features[:capacity] = self.features
+            self.features = features
+        self._free_slots.extend(range(new_capacity - 1, capacity - 1, -1))
+
+
+def _iou(x1_t, y1_t, x2_t, y2_t, x1_o, y1_o, x2_o, y2_o):
+    """
+    IoU of two bounding boxes given as Python floats.
+    Conditional expressions are used instead of max/min to avoid the builtin calls.
+    """
+    # Determine the coordinates of the intersection rectangle
+    x1_inter = x1_t if x1_t > x1_o else x1_o
+    y1_inter = y1_t if y1_t > y1_o else y1_o
+    x2_inter = x2_t if x2_t < x2_o else x2_o
+    y2_inter = y2_t if y2_t < y2_o else y2_o
+
+    # Compute the area of intersection
+    dx = x2_inter - x1_inter
+    dy = y2_inter - y1_inter
+    inter_area = (dx if dx > 0.0 else 0.0) * (dy if dy > 0.0 else 0.0)
+
+    # Compute the area of both the prediction and ground-truth rectangles
+    track_area = (x2_t - x1_t) * (y2_t - y1_t)
+    other_area = (x2_o - x1_o) * (y2_o - y1_o)
+
+    # Compute the Intersection over Union (IoU)
+    union_area = track_area + other_area - inter_area
+    return inter_area / union_area if union_area > 0 else 0.0
+
+
+def pairwise_iou(pred: np.ndarray, det: np.ndarray) -> np.ndarray:
+    """
+    Calculate the Intersection over Union (IoU) between every pair of bounding boxes.
+
+    :param pred: (T, 4) array of predicted track bounding boxes [x1, y1, x2, y2].
+    :param det: (D, 4) array of detection bounding boxes [x1, y1, x2, y2].
+    :return: (T, D) array of IoU scores.
+    """
+    # Corners of the intersection rectangles, broadcast to (T, D, 2)
+    xy1 = np.maximum(pred[:, None, :2], det[None, :, :2])
+    xy2 = np.minimum(pred[:, None, 2:], det[None, :, 2:])
+    wh = np.clip(xy2 - xy1, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+
+    area_t = (pred[:, 2] - pred[:, 0]) * (pred[:, 3] - pred[:, 1])
+    area_o = (det[:, 2] - det[:, 0]) * (det[:, 3] - det[:, 1])
+    return inter / (area_t[:, None] + area_o[None, :] - inter + 1e-9)
+
+
+_MIN_PERSISTENCE = 3
+
+
+def _build_progress_bar(current_progress: int, min_persistence: int) -> str:
+    progress_char = " *"  # Solid square
+    empty_char = " ."
+
+    # Create the progress bar
+    progress_bar = progress_char * current_progress + empty_char * (
+        min_persistence - current_progress
+    )
+
+    return "tracking" + f"  [{progress_bar}]"
+
+
 class Track:
     """
     A class representing a tracked object with its properties and state.
@@ -22,8 +215,22 @@ class Track:
         min_persistence: Minimum number of detections required before track is considered stable
         is_candidate: Boolean indicating if this is a candidate track (not yet confirmed)
         _is_detected: Private boolean indicating if the track was detected in the current frame
+        x1, y1, x2, y2: Current bounding box coordinates as Python floats
+        history: The last HISTORY_LENGTH bounding boxes of the track, oldest first.
+            Only kept for debugging (keep_history), None otherwise
+
+    bbox, predicted_bbox, velocity and feature_vector are views on the track's row
+    of a TrackBuffer. As before, predicted_bbox is only written by update(), so an
+    aged track keeps being matched against the prediction made at its last update.
     """
 
+    HISTORY_LENGTH = 32
+    min_persistence: int = _MIN_PERSISTENCE
+    # Progress bars of a track candidate, indexed by its persistence
+    _PROGRESS_BARS = tuple(
+        _build_progress_bar(k, _MIN_PERSISTENCE) for k in range(_MIN_PERSISTENCE + 1)
+    )
+
     def __init__(
         self,
         track_id,
@@ -32,6 +239,8 @@ class Track:
         distance,
         label=None,
         is_candidate: bool = False,
+        buffer: Optional[TrackBuffer] = None,
+        keep_history: bool = False,
     ):
         """
         Initialize a track with a unique ID, bounding box, and re-id feature vector.
@@ -39,33 +248,90 @@ class Track:
         :param track_id: Unique identifier for the track.
         :param bbox: Bounding box coordinates [x1, y1, x2, y2].
         :param feature_vector: a CUDA torch Tensor. Feature vector for re-id matching.
+        :param buffer: TrackBuffer holding the motion state. A private one is created if None.
+        :param keep_history: Record the last bounding boxes of the track, for debugging.
         """
         self.track_id = track_id
-        self.bbox = np.array(bbox)
-        self.predicted_bbox = np.array(bbox)
+        self._buffer = buffer if buffer is not None else TrackBuffer(capacity=1)
+        self._idx = self._buffer.allocate(bbox)  # Initial velocity is zero (no motion)
         self.feature_vector = feature_vector
         self.age = 0  # Time since the last update
-        self.history = [np.array(bbox)]  # Stores past bounding boxes for this track
-        self.velocity = np.array([0, 0, 0, 0])  # Initial velocity (no motion)
+        # Ring buffer of the last HISTORY_LENGTH bounding boxes of this track
+        self._history: Optional[np.ndarray] = None
+        self._history_count = 1
+        if keep_history:
+            self._history = np.zeros((self.HISTORY_LENGTH, 4), dtype=np.float32)
+            self._history[0] = bbox
         self.distance = distance
+        self._update_coordinates()
 
         self.label = label
 
         self.persistence: int = 0
-        self.min_persistence: int = 3
         self.is_candidate: bool = is_candidate
         self._is_detected: bool = True
 
+    @property
+    def slot(self) -> int:
+        """
+        Index of the row of this track in its TrackBuffer.
+        """
+        return self._idx
+
+    @property
+    def bbox(self) -> np.ndarray:
+        return self._buffer.bboxes[self._idx]
+
+    @property
+    def predicted_bbox(self) -> np.ndarray:
+        return self._buffer.predicted_bboxes[self._idx]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._buffer.velocities[self._idx]
+
+    @property
+    def feature_vector(self) -> torch.Tensor:
+        return self._buffer.get_features(self._idx)
+
+    @feature_vector.setter
+    def feature_vector(self, feature_vector: torch.Tensor):
+        self._buffer.set_feature(self._idx, feature_vector)
+
+    @property
+    def history(self) -> Optional[np.ndarray]:
+        if self._history is None:
+            return None
+        if self._history_count <= self.HISTORY_LENGTH:
+            return self._history[: self._history_count].copy()
+        oldest = self._history_count % self.HISTORY_LENGTH
+        return np.roll(self._history, -oldest, axis=0)
+
+    def release(self):
+        """
+        Free the slot of this track in its TrackBuffer. The track must not be used afterwards.
+        """
+        self._buffer.release(self._idx)
+
     def __eq__(self, other) -> bool:
         """
         To test serialization, so just on unique id, bbox, feature vector
         """
-        if not isinstance(other, Track):
-            return False
         return (
-            self.track_id == other.track_id
-            and np.array_equal(self.bbox, other.bbox)
-            and np.array_equal(self.feature_vector, other.feature_vector)
+            other.__class__ is Track
+            and self.track_id == other.track_id
+            and self.x1 == other.x1
+            and self.y1 == other.y1
+            and self.x2 == other.x2
+            and self.y2 == other.y2
+            and self._feature_vectors_equal(other)
+        )
+
+    def _feature_vectors_equal(self, other: "Track") -> bool:
+        feature_vector, other_feature_vector = self.feature_vector, other.feature_vector
+        # torch.equal raises on tensors from different devices
+        return feature_vector.device == other_feature_vector.device and torch.equal(
+            feature_vector, other_feature_vector
         )
 
     def update(self, bbox, feature_vector: torch.Tensor, distance):
@@ -77,17 +343,28 @@ class Track:
         :param feature_vector: New feature vector.
         """
         self.distance = distance
-        bbox = np.array(bbox)
-        self.velocity = bbox - self.bbox  # Update velocity
-        self.bbox = bbox
-        self.history.append(bbox)
+        buffer, i = self._buffer, self._idx
+        np.subtract(bbox, buffer.bboxes[i], out=buffer.velocities[i])  # Update velocity
+        buffer.bboxes[i] = bbox
+        np.add(buffer.bboxes[i], buffer.velocities[i], out=buffer.predicted_bboxes[i])
+        if self._history is not None:
+            self._history[self._history_count % self.HISTORY_LENGTH] = bbox
+            self._history_count += 1
         self.feature_vector = feature_vector
         self.age = 0
-        self.predicted_bbox = self.predict()
+        self._update_coordinates()
+
+    def _update_coordinates(self):
+        """
+        Cache the bbox (x1, y1, x2, y2) as Python floats, which are much cheaper
+        to read than ndarray elements.
+        """
+        self.x1, self.y1, self.x2, self.y2 = self.bbox.tolist()
 
     def predict(self):
         """
         Predict the next position based on the current velocity and last known position.
+        The tracker itself uses predicted_bbox, which is written in place by update().
 
         :return: Predicted bounding box coordinates.
         """
@@ -109,7 +386,9 @@ class Track:
         If not updated, the prediction is updated using the velocity.
         """
         self.age += 1
-        self.bbox = self.predict()  # Update the bbox with the predicted one
+        bbox = self.bbox  # View on the row of the track in the TrackBuffer
+        np.add(bbox, self.velocity, out=bbox)  # Update the bbox with the predicted one
+        self._update_coordinates()
 
     def iou(self, bbox):
         """
@@ -125,27 +404,18 @@ class Track:
 
         :return: IoU score.
         """
-        x1_t, y1_t, x2_t, y2_t = self.predicted_bbox
+        x1_t, y1_t, x2_t, y2_t = self.predicted_bbox.tolist()
         x1_o, y1_o, x2_o, y2_o = bbox
-
-        # Determine the coordinates of the intersection rectangle
-        x1_inter = max(x1_t, x1_o)
-        y1_inter = max(y1_t, y1_o)
-        x2_inter = min(x2_t, x2_o)
-        y2_inter = min(y2_t, y2_o)
-
-        # Compute the area of intersection
-        inter_area = max(0, x2_inter - x1_inter) * max(0, y2_inter - y1_inter)
-
-        # Compute the area of both the prediction and ground-truth rectangles
-        track_area = (x2_t - x1_t) * (y2_t - y1_t)
-        other_area = (x2_o - x1_o) * (y2_o - y1_o)
-
-        # Compute the Intersection over Union (IoU)
-        union_area = track_area + other_area - inter_area
-        iou = inter_area / union_area if union_area > 0 else 0
-
-        return iou
+        return _iou(
+            x1_t,
+            y1_t,
+            x2_t,
+            y2_t,
+            float(x1_o),
+            float(y1_o),
+            float(x2_o),
+            float(y2_o),
+        )
 
     def get_detection(
         self,
@@ -156,7 +426,8 @@ class Track:
         class_name = self._get_class_name()
 
         # Convert bbox from cropped coordinates to original image coordinates
-        x_min, y_min, x_max, y_max = self.bbox
+        x_min, y_min = int(self.x1), int(self.y1)
+        x_max, y_max = int(self.x2), int(self.y2)
 
         if crop_region:
             # Adjust coordinates based on crop region
@@ -191,19 +462,11 @@ class Track:
         :param max_persistence: The maximum progress level
         :return: A string with the emoji progress bar
         """
-        progress_char = " *"  # Solid square
-        empty_char = " ."
-
         # Ensure current_progress does not exceed max_persistence
-        if self.persistence > min_persistence:
-            current_progress = min_persistence
-
-        # Create the progress bar
-        progress_bar = progress_char * current_progress + empty_char * (
-            min_persistence - current_progress
-        )
-
-        return "tracking" + f"  [{progress_bar}]"
+        current_progress = min(current_progress, min_persistence)
+        if min_persistence == _MIN_PERSISTENCE:
+            return self._PROGRESS_BARS[current_progress]
+        return _build_progress_bar(current_progress, min_persistence)
 
     def set_is_detected(self):
         self._is_detected = True
@@ -2,7 +2,6 @@ import asyncio
 import datetime
 import os
 from asyncio import Event, create_task, sleep
-from copy import deepcopy
 from typing import Dict, List
 
 import numpy as np
@@ -17,7 +16,7 @@ from src.config.config import TrackerConfig
 from src.image.image import ImageObject
 from src.tracker.detector.detector import Detector
 from src.tracker.embedder.embedder import Embedder
-from src.tracker.track import Track
+from src.tracker.track import Track, TrackBuffer, pairwise_iou
 
 # from src.tracker.encoder.feature_encoder import FeatureEncoder, get_encoder
 # from src.tracker.face_id.identifier import FaceIdentifier
@@ -57,6 +56,9 @@ class Tracker:
 
         self.detector: Detector = detector
         self.embedder: Embedder = embedder
+        self.track_buffer = TrackBuffer(
+            quantize_features=cfg.embedder_config.quantize_features
+        )
         self.tracks: Dict[str, Track] = {}
 
         self.track_candidates: List[Track] = []
@@ -89,7 +91,9 @@ class Tracker:
         self.stop_event.set()
         try:
             if self.background_task is not None:
-                await self.background_task  # Wait for the background task to finish
+                # Wait for the background task to finish. It is shielded so that
+                # cancelling a caller does not cancel the background task.
+                await asyncio.shield(self.background_task)
         except Exception as e:
             LOGGER.error(f"Error stopping background task: {e}")
 
@@ -103,6 +107,8 @@ class Tracker:
                 if self.last_image is not None:
                     # Check if the current image is identical to the last one to avoid processing duplicates
                     if torch.equal(img.uint8_tensor, self.last_image.uint8_tensor):
+                        # Sleep anyway so a frozen camera does not starve the event loop
+                        await sleep(self.sleep_period)
                         continue
                 self.last_image = img
                 try:
@@ -120,7 +126,7 @@ class Tracker:
         except Exception as e:
             LOGGER.error(f"Error getting image: {e}")
             return None
-        return ImageObject(viam_img, device=self.device, crop_region=self.crop_region)
+        return ImageObject(viam_img, crop_region=self.crop_region)
 
     def relabel_tracks(self, dict_old_label_new_label: Dict[str, str]):
         answer = {}
@@ -207,9 +213,12 @@ class Tracker:
                 f"Number of feature vectors ({len(features_vectors)}) does not match number of detections ({len(detections)})"
             )
             return
+        detection_features = torch.stack(features_vectors)
         # Solve the linear assignment problem to find the best matching
         row_indices, col_indices, cost_matrix = self.get_matching_tracks(
-            tracks=self.tracks, detections=detections, feature_vectors=features_vectors
+            tracks=self.tracks,
+            detections=detections,
+            feature_vectors=detection_features,
         )
         # Update matched tracks
         for row, col in zip(row_indices, col_indices):
@@ -241,11 +250,15 @@ class Tracker:
                         feature_vector=feature_vector,
                     )
             else:
-                unmatched_detections = [detections[i] for i in unmatched_detections_idx]
+                unmatched_detections_ids = sorted(unmatched_detections_idx)
+                unmatched_detections = [detections[i] for i in unmatched_detections_ids]
+                unmatched_features = [
+                    features_vectors[i] for i in unmatched_detections_ids
+                ]
                 track_candidate_idx, unmatched_detection_idx, cost_matrix = (
                     self.get_matching_track_candidates(
                         detections=unmatched_detections,
-                        features_vectors=features_vectors,
+                        features_vectors=detection_features[unmatched_detections_ids],
                     )
                 )
                 promoted_track_candidates = []
@@ -259,7 +272,7 @@ class Tracker:
                     if distance < self.distance_threshold:
                         matching_track_candidate.update(
                             bbox=detection.bbox,
-                            feature_vector=features_vectors[unmatched_detection_id],
+                            feature_vector=unmatched_features[unmatched_detection_id],
                             distance=distance,
                         )
                         matching_track_candidate.increment_persistence()
@@ -270,7 +283,9 @@ class Tracker:
                             promoted_track_candidates.append(track_candidate_id)
                             new_track_id = self.promote_to_track(
                                 track_candidate_id,
-                                feature_vector=features_vectors[unmatched_detection_id],
+                                feature_vector=unmatched_features[
+                                    unmatched_detection_id
+                                ],
                             )
                             new_tracks_ids.add(new_track_id)
                             self.tracks[new_track_id].set_is_detected()
@@ -280,7 +295,7 @@ class Tracker:
                     else:
                         self.add_track_candidate(
                             detection=detection,
-                            feature_vector=features_vectors[unmatched_detection_id],
+                            feature_vector=unmatched_features[unmatched_detection_id],
                         )
                 for track_candidate_id in sorted(  # sort and reverse the iteration over the promoted track_candidates to not mess up the indexes
                     promoted_track_candidates,
@@ -290,11 +305,13 @@ class Tracker:
                         track_candidate_id
                     ]  # delete track candidate that were not found again
 
-                self.track_candidates = [
-                    track_candidate
-                    for track_candidate in self.track_candidates
-                    if track_candidate.is_detected()
-                ]  # mark track candidates that were not found again
+                detected_track_candidates = []
+                for track_candidate in self.track_candidates:
+                    if track_candidate.is_detected():
+                        detected_track_candidates.append(track_candidate)
+                    else:
+                        track_candidate.release()  # track candidate was not found again
+                self.track_candidates = detected_track_candidates
 
         self.current_tracks_id = updated_tracks_ids.union(new_tracks_ids)
 
@@ -314,49 +331,67 @@ class Tracker:
             )
 
     def get_matching_tracks(
-        self, tracks: Dict[str, Track], detections: List[Detection], feature_vectors
+        self,
+        tracks: Dict[str, Track],
+        detections: List[Detection],
+        feature_vectors: torch.Tensor,
     ):
-        # Initialize cost matrix
-        cost_matrix = np.zeros((len(tracks), len(detections)))
-
-        # Calculate cost for each pair of track and detection
-        track_ids = list(tracks.keys())
-        for i, track_id in enumerate(track_ids):
-            track = tracks[track_id]
-            for j, detection in enumerate(detections):
-                iou_score = track.iou(detection.bbox)
-                feature_dist = self.embedder.compute_distance(
-                    track.feature_vector, feature_vectors[j]
-                )
-                # Cost function: lambda * feature distance + (1 - lambda) * (1 - IoU)
-                cost_matrix[i, j] = self.lambda_value * feature_dist + (
-                    1 - self.lambda_value
-                ) * (1 - iou_score)
+        """
+        :param feature_vectors: (len(detections), dim) tensor of the detection feature vectors
+        """
+        cost_matrix = self.get_cost_matrix(
+            list(tracks.values()), detections, feature_vectors
+        )
         # Solve the linear assignment problem to find the best matching
         row_indices, col_indices = linear_sum_assignment(cost_matrix)
         return row_indices, col_indices, cost_matrix
 
-    def get_matching_track_candidates(self, detections: List, features_vectors):
+    def get_matching_track_candidates(
+        self, detections: List, features_vectors: torch.Tensor
+    ):
         """
         Should pass the detections that are not matched with current tracks
+        and their (len(detections), dim) tensor of feature vectors
         """
-        # Initialize cost matrix
-        cost_matrix = np.zeros((len(self.track_candidates), len(detections)))
-
-        for i, track in enumerate(self.track_candidates):
-            for j, detection in enumerate(detections):
-                iou_score = track.iou(detection.bbox)
-                feature_dist = self.embedder.compute_distance(
-                    track.feature_vector, features_vectors[j]
-                )
-                # Cost function: lambda * feature distance + (1 - lambda) * (1 - IoU)
-                cost_matrix[i, j] = self.lambda_value * feature_dist + (
-                    1 - self.lambda_value
-                ) * (1 - iou_score)
+        cost_matrix = self.get_cost_matrix(
+            self.track_candidates, detections, features_vectors
+        )
         # Solve the linear assignment problem to find the best matching
         row_indices, col_indices = linear_sum_assignment(cost_matrix)
         return row_indices, col_indices, cost_matrix
 
+    def get_cost_matrix(
+        self, tracks: List[Track], detections: List, features_vectors: torch.Tensor
+    ) -> np.ndarray:
+        """
+        Compute the cost of matching each track with each detection.
+        """
+        if not tracks or not detections:
+            return np.zeros((len(tracks), len(detections)))
+
+        slots = [track.slot for track in tracks]
+        iou_scores = self.get_iou_matrix(slots, detections)
+        feature_dists = self.embedder.compute_distance_matrix(
+            self.track_buffer.gather_features(slots), features_vectors
+        )
+        # Cost function: lambda * feature distance + (1 - lambda) * (1 - IoU)
+        return self.lambda_value * feature_dists + (1 - self.lambda_value) * (
+            1 - iou_scores
+        )
+
+    def get_iou_matrix(self, slots: List[int], detections: List) -> np.ndarray:
+        """
+        Compute the IoU between the predicted bbox of each track and each detection.
+
+        :param slots: TrackBuffer slots of the tracks.
+        :return: (len(slots), len(detections)) array of IoU scores.
+        """
+        pred_bboxes = self.track_buffer.predicted_bboxes[slots]
+        det_bboxes = np.array(
+            [detection.bbox for detection in detections], dtype=np.float32
+        ).reshape(-1, 4)
+        return pairwise_iou(pred_bboxes, det_bboxes)
+
     def add_track_candidate(self, detection, feature_vector: torch.Tensor):
         new_track_candidate = Track(
             track_id=detection.category,
@@ -364,6 +399,8 @@ class Tracker:
             feature_vector=feature_vector,
             distance=0,
             is_candidate=True,
+            buffer=self.track_buffer,
+            keep_history=self.debug,
         )
         new_track_candidate.set_is_detected()
         self.track_candidates.append(new_track_candidate)
@@ -377,7 +414,9 @@ class Tracker:
                 f"Can't find track candidate at indice {track_candidate_indice}"
             )
 
-        track_candidate = deepcopy(self.track_candidates[track_candidate_indice])
+        # The track candidate is removed from self.track_candidates by the caller,
+        # so it is promoted as is and keeps its slot in the track buffer
+        track_candidate = self.track_candidates[track_candidate_indice]
 
         track_candidate.is_candidate = False
         track_id = self.generate_track_id(
@@ -402,7 +441,7 @@ class Tracker:
 
                 # Optionally remove old tracks
                 if self.tracks[track_id].age > self.max_age_track:
-                    del self.tracks[track_id]
+                    self.tracks.pop(track_id).release()
 
     def generate_track_id(self, category):
         """
@@ -3,7 +3,8 @@ This module provides a Viam Vision Service module
 to perform face Re-Id.
 """
 
-from asyncio import create_task
+from asyncio import Task, create_task, gather
+from collections import OrderedDict
 from typing import Any, ClassVar, Dict, List, Mapping, Optional, Sequence
 
 from typing_extensions import Self
@@ -35,6 +36,35 @@ from src.tracker.tracker import Tracker
 
 LOGGER = getLogger(__name__)
 
+# Validated TrackerConfig objects, keyed by the serialized ServiceConfig
+_CONFIG_CACHE: "OrderedDict[bytes, TrackerConfig]" = OrderedDict()
+_CONFIG_CACHE_SIZE = 8
+
+
+def _get_tracker_config(config: ServiceConfig) -> TrackerConfig:
+    """
+    Return the TrackerConfig for this config, only validating it if it was not seen recently.
+    """
+    key = config.SerializeToString(deterministic=True)
+    tracker_cfg = _CONFIG_CACHE.get(key)
+    if tracker_cfg is not None:
+        _CONFIG_CACHE.move_to_end(key)
+        return tracker_cfg
+
+    tracker_cfg = TrackerConfig(config)
+    _CONFIG_CACHE[key] = tracker_cfg
+    if len(_CONFIG_CACHE) > _CONFIG_CACHE_SIZE:
+        _CONFIG_CACHE.popitem(last=False)
+    return tracker_cfg
+
+
+def _config_values(cfg) -> tuple:
+    """
+    Return the values of the fields of a config object, to detect config changes.
+    The config classes declare __slots__, so every field they set is listed there.
+    """
+    return tuple(getattr(cfg, field) for field in cfg.__slots__)
+
 
 class TrackerService(Vision, Reconfigurable):
     """TrackerService is a subclass a Viam Vision Service"""
@@ -49,6 +79,10 @@ class TrackerService(Vision, Reconfigurable):
         self.detector: Detector = None
         self.embedder: Embedder = None
         self.tracker = None
+        self._detector_key = None
+        self._embedder_key = None
+        self._tracker_key = None
+        self._reconfig_task: Optional[Task] = None
 
     @classmethod
     def new_service(
@@ -74,42 +108,67 @@ class TrackerService(Vision, Reconfigurable):
             dependencies.append(embedder_name)
 
         # validate the config
-        _ = TrackerConfig(config)
+        _ = _get_tracker_config(config)
         return dependencies
 
     def reconfigure(
         self, config: ServiceConfig, dependencies: Mapping[ResourceName, ResourceBase]
     ):
-        tracker_cfg = TrackerConfig(config)
+        tracker_cfg = _get_tracker_config(config)
         self.camera_name = config.attributes.fields["camera_name"].string_value
         self.camera = dependencies[Camera.get_resource_name(self.camera_name)]
         detector_name = config.attributes.fields["detector_name"].string_value
-
-        if not detector_name:
-            LOGGER.warning("No detector name provided, using default detector")
-            self.detector = TorchvisionDetector(tracker_cfg.detector_config)
-        else:
+        vision_service = None
+        if detector_name:
             vision_service = dependencies[Vision.get_resource_name(detector_name)]
-            self.detector = CustomVisionServiceDetector(
-                tracker_cfg.detector_config, vision_service
-            )
+
+        # Only rebuild the detector if its config or its vision service changed
+        detector_key = (vision_service, _config_values(tracker_cfg.detector_config))
+        if self.detector is None or detector_key != self._detector_key:
+            if vision_service is None:
+                LOGGER.warning("No detector name provided, using default detector")
+                self.detector = TorchvisionDetector(tracker_cfg.detector_config)
+            else:
+                self.detector = CustomVisionServiceDetector(
+                    tracker_cfg.detector_config, vision_service
+                )
+            self._detector_key = detector_key
+
         embedder_name = config.attributes.fields["embedder_name"].string_value
-        if not embedder_name:
-            LOGGER.warning(
-                "No embedder name provided, using default embedder"
-            )  # TODO: change this when we have a default embedder
-            ml_model_service = FakeEmbedderMLModel("FAKE_NAME")
-            self.embedder = CustomMLModelServiceEmbedder(
-                tracker_cfg.embedder_config, ml_model_service
-            )
-        else:
+        ml_model_service = None
+        if embedder_name:
             ml_model_service = dependencies[MLModel.get_resource_name(embedder_name)]
+
+        # Only rebuild the embedder if its config or its ML model service changed
+        embedder_key = (ml_model_service, _config_values(tracker_cfg.embedder_config))
+        if self.embedder is None or embedder_key != self._embedder_key:
+            if ml_model_service is None:
+                LOGGER.warning(
+                    "No embedder name provided, using default embedder"
+                )  # TODO: change this when we have a default embedder
+                ml_model_service = FakeEmbedderMLModel("FAKE_NAME")
             self.embedder = CustomMLModelServiceEmbedder(
                 tracker_cfg.embedder_config, ml_model_service
             )
+            self._embedder_key = embedder_key
 
+        # Only replace the tracker if any attribute or one of its components changed.
+        # The whole attributes are compared, so no field of TrackerConfig is missed.
+        tracker_key = (
+            config.attributes.SerializeToString(deterministic=True),
+            self.camera,
+            self.detector,
+            self.embedder,
+        )
         if self.tracker is not None:
-            create_task(self.stop_and_get_new_tracker(tracker_cfg))
+            if tracker_key != self._tracker_key:
+                # Keep a handle on the task so it is not garbage collected, and
+                # cancel a pending one so that two tracker swaps never overlap
+                if self._reconfig_task is not None and not self._reconfig_task.done():
+                    self._reconfig_task.cancel()
+                self._reconfig_task = create_task(
+                    self.stop_and_get_new_tracker(tracker_cfg)
+                )
         else:
             self.tracker = Tracker(
                 tracker_cfg,
@@ -118,10 +177,16 @@ class TrackerService(Vision, Reconfigurable):
                 embedder=self.embedder,
             )
             self.tracker.start()
+        self._tracker_key = tracker_key
 
     async def stop_and_get_new_tracker(self, tracker_cfg):
         await self.tracker.stop()
-        self.tracker = Tracker(tracker_cfg, camera=self.camera, detector=self.detector)
+        self.tracker = Tracker(
+            tracker_cfg,
+            camera=self.camera,
+            detector=self.detector,
+            embedder=self.embedder,
+        )
         self.tracker.start()
 
     async def get_properties(
@@ -232,6 +297,11 @@ class TrackerService(Vision, Reconfigurable):
             await component.close()
 
         """
+        if self._reconfig_task is not None:
+            # A failed or cancelled swap must not prevent stopping the tracker.
+            (result,) = await gather(self._reconfig_task, return_exceptions=True)
+            if isinstance(result, BaseException):
+                LOGGER.error(f"Error replacing the tracker: {result!r}")
         await self.tracker.stop()
         await super().close()
         return